@@ -7,18 +7,22 @@ that can be easily modified by LLMs and adapted across organizations.
 
 from __future__ import annotations
 
-# Import builder components
-from .builder import (
-    IndentationPreferences,
-    Item,
-    ItemLike,
-    PromptSection,
-    PromptText,
-    StructuredPromptFactory,
-)
-
-# Import generator
-from .generator import PromptStructureGenerator
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    # Builder components
+    from .builder import (
+        IndentationPreferences,
+        Item,
+        ItemLike,
+        PromptSection,
+        PromptText,
+        StructuredPromptFactory,
+    )
+
+    # Generator
+    from .generator import PromptStructureGenerator
 
 __version__ = "0.2.0"
 
@@ -35,3 +39,29 @@ __all__ = [
     # Version
     "__version__",
 ]
+
+# Public names are imported from their subpackage on first access (PEP 562), so importing the
+# package or one of its modules (e.g. dynamic_prompt_builder) does not load the builder or the
+# YAML generator until they are used.
+_LAZY_EXPORTS: Dict[str, str] = {
+    "IndentationPreferences": ".builder",
+    "Item": ".builder",
+    "ItemLike": ".builder",
+    "PromptSection": ".builder",
+    "PromptText": ".builder",
+    "StructuredPromptFactory": ".builder",
+    "PromptStructureGenerator": ".generator",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(module, __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
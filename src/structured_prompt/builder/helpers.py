@@ -4,6 +4,7 @@ import re
 import re as _re
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple, Union
 
 # Optional runtime Stage dataclass fallback
@@ -50,7 +51,7 @@ def _try_import_generated_stages():
     return Stages, top_map or {}
 
 
-@dataclass
+@dataclass(frozen=True)
 class _CriticalStep:
     title: str
     description: str
@@ -85,6 +86,7 @@ def _norm_key(key: Union[str, Enum, object]) -> str:
 
 
 _CAMEL_BOUNDARY = re.compile(r"(?<!^)(?=[A-Z])")
+_WORD_SEPARATORS = re.compile(r"[_\s]+")
 
 
 def _title_from_class_name(name: str) -> str:
@@ -92,28 +94,27 @@ def _title_from_class_name(name: str) -> str:
     return " ".join(p.capitalize() for p in parts if p)
 
 
+@lru_cache(maxsize=1024)
+def _title_from_text(raw: str) -> str:
+    """Display title for a stripped stage display name or key, e.g. "OutputTemplate" -> "Output Template"."""
+    if not raw:
+        return ""
+    if _WORD_SEPARATORS.search(raw):
+        words = _WORD_SEPARATORS.split(raw)
+        return " ".join(w.capitalize() for w in words if w)
+    return _title_from_class_name(raw)
+
+
 def _title_from_key(key):
     if _is_stage_class(key):
         display = getattr(key, "__stage_display__", key.__name__)
-        display = display.strip()
-        if not display:
-            return ""
-        if re.search(r"[_\s]", display):
-            words = re.split(r"[_\s]+", display)
-            return " ".join(w.capitalize() for w in words if w)
-        return _title_from_class_name(display)
+        return _title_from_text(display.strip())
 
     if isinstance(key, Enum):
         raw = str(key.value).strip()
     else:
         raw = str(key).strip()
-
-    if not raw:
-        return ""
-    if re.search(r"[_\s]", raw):
-        words = re.split(r"[_\s]+", raw)
-        return " ".join(w.capitalize() for w in words if w)
-    return _title_from_class_name(raw)
+    return _title_from_text(raw)
 
 
 def _letters(idx: int) -> str:
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Hashable, List, Optional, Union
 
-from .preferences import IndentationPreferences
+from .preferences import IndentationPreferences, _spaces
 
 
 class Item:
+    __slots__ = ()
+
+    def fingerprint(self) -> Optional[Hashable]:
+        """Return a hashable snapshot of everything that affects rendering, or None if not cacheable."""
+        return None
+
     def render(
         self,
         *,
@@ -19,10 +26,65 @@ class Item:
         raise NotImplementedError
 
 
+# Count of in-place edits to any PromptText's text. Section fingerprints memoized under an
+# older count are recomputed, since a text item does not know which sections contain it.
+_text_edits = [0]
+
+
 @dataclass
 class PromptText(Item):
+    """Plain text item. Plain strings coerced to items may share one instance per text."""
+
+    __slots__ = ("text", "__weakref__")
+
     text: str
 
+    def __setattr__(self, name, value):
+        if name == "text" and hasattr(self, "text"):
+            _text_edits[0] += 1
+            # The pool maps text to item, so an edited item must not be handed out again.
+            _text_item.cache_clear()
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def of(cls, text: str) -> PromptText:
+        """Return a shared `PromptText` for `text` instead of allocating a new one per use."""
+        if cls is PromptText:
+            return _text_item(text)
+        return cls(text)
+
+    def __reduce_ex__(self, protocol):
+        # Plain text re-pools via of(); subclasses (which may have their own __init__) take the
+        # default path, restoring their slots and __dict__ through __setstate__.
+        if type(self) is PromptText:
+            return (PromptText.of, (self.text,))
+        return super().__reduce_ex__(protocol)
+
+    def __setstate__(self, state):
+        # state is the instance dict, or a (dict or None, slots) pair when there are slots.
+        # Restored with object.__setattr__ so copying is not counted as an in-place edit.
+        if isinstance(state, tuple):
+            state, slots = state
+        else:
+            slots = None
+        for values in (state, slots):
+            if values:
+                for name, value in values.items():
+                    object.__setattr__(self, name, value)
+
+    # False for subclasses that override rendering: their output may depend on state the base
+    # fingerprint does not cover, so they are never cached unless they define fingerprint().
+    _base_rendering = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._base_rendering = cls.render is PromptText.render and cls._render_lines is PromptText._render_lines
+
+    def fingerprint(self) -> Optional[Hashable]:
+        if not self._base_rendering:
+            return None
+        return (type(self), self.text)
+
     def render(
         self,
         *,
@@ -32,28 +94,59 @@ class PromptText(Item):
         prev_style: Optional[str],
         ignore_bullets: bool,
     ) -> str:
+        return "\n".join(
+            self._render_lines(idx=idx, level=level, prefs=prefs, prev_style=prev_style, ignore_bullets=ignore_bullets)
+        )
+
+    def _render_lines(
+        self,
+        *,
+        idx: int,
+        level: int,
+        prefs: IndentationPreferences,
+        prev_style: Optional[str],
+        ignore_bullets: bool,
+    ) -> List[str]:
         if ignore_bullets:
-            left = " " * (prefs.spaces_per_level * level)
-            hang = " " * (prefs.spaces_per_level * level + 2)  # 2 spaces for hanging indent
-            lines = self.text.strip().splitlines() or [""]
-            out = [left + lines[0]]
-            out += [hang + ln.strip() for ln in lines[1:]]
-            return "\n".join(out)
-
-        cur_style = prefs.next_style(prev_style)
-        prefix = prefs.bullet_from_style(cur_style, idx)
-        left = " " * (prefs.spaces_per_level * level)
-        hang = " " * (prefs.spaces_per_level * level + len(prefix))
-        lines = self.text.strip().splitlines() or [""]
-        out = [left + prefix + lines[0]]
-        out += [hang + ln.strip() for ln in lines[1:]]
-        return "\n".join(out)
+            prefix = ""
+            hang_width = 2  # 2 spaces for hanging indent
+        else:
+            prefix = prefs.bullet_from_style(prefs.next_style(prev_style), idx)
+            hang_width = len(prefix)
+        left = prefs.indent_for(level)
+        out: List[str] = []
+        _emit_text(out, self.text, left, prefix, _spaces(len(left) + hang_width))
+        return out
+
+
+def _emit_text(out: List[str], text: str, left: str, prefix: str, hang: str) -> None:
+    """Append text to `out` as `left + prefix` on the first line and `hang` on continuation lines.
+
+    Lines go straight into the caller's list, so a section's whole body is built in one list
+    without a temporary list (or joined string) per text item.
+    """
+    text = text.strip()
+    if text.isprintable():  # no line boundaries of any kind: single line, skip splitlines()
+        out.append(f"{left}{prefix}{text}")
+        return
+    lines = text.splitlines() or [""]
+    out.append(f"{left}{prefix}{lines[0]}")
+    append = out.append
+    for ln in lines[1:]:
+        append(hang + ln.strip())
 
 
 ItemLike = Union[Item, str]
 
 
+@lru_cache(maxsize=1024)
+def _text_item(text: str) -> PromptText:
+    return PromptText(text)
+
+
 def _as_item(x: ItemLike) -> Item:
-    return x if isinstance(x, Item) else PromptText(str(x))
+    if x.__class__ is str:
+        return _text_item(x)
+    return x if isinstance(x, Item) else _text_item(str(x))
 
 
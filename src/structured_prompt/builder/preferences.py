@@ -1,7 +1,52 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+@lru_cache(maxsize=128)
+def _spaces(width: int) -> str:
+    """Shared, interned run of `width` spaces used as line indentation."""
+    return sys.intern(" " * width)
+
+
+# Bullet tokens are shared by every rendered item; intern them once so cache keys and
+# comparisons that include them are identity checks.
+_BULLET_DASH = sys.intern("- ")
+_BULLET_STAR = sys.intern("* ")
+
+
+@lru_cache(maxsize=64)
+def _custom_bullet(style: str) -> str:
+    """Bullet text for a user-supplied style token, e.g. "→" -> "→ "."""
+    return sys.intern(style if style.endswith(" ") else style + " ")
+
+
+@lru_cache(maxsize=256)
+def _number_bullet(idx: int) -> str:
+    """Bullet text for the "number" style, e.g. 3 -> "3. "."""
+    return sys.intern(f"{idx}. ")
+
+
+@lru_cache(maxsize=256)
+def _alpha_bullet(idx: int) -> str:
+    """Bullet text for the "loweralpha" style, e.g. 2 -> "b. ", 27 -> "aa. "."""
+    n = idx
+    out = []
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        out.append(chr(ord("a") + r))
+    return sys.intern("".join(reversed(out)) + ". ")
+
+
+# Styles whose bullet text does not depend on the item index.
+_CONSTANT_BULLETS: Dict[str, str] = {"dash": _BULLET_DASH, "star": _BULLET_STAR}
+
+# Styles whose bullet text depends on the item index ("1. ", "b. "); all others are constant.
+_INDEXED_BULLETS: Dict[str, Callable[[int], str]] = {"number": _number_bullet, "loweralpha": _alpha_bullet}
+_INDEXED_STYLES = frozenset(_INDEXED_BULLETS)
 
 
 @dataclass
@@ -11,26 +56,26 @@ class IndentationPreferences:
     fallback: str = "dash"
     blank_line_between_top: bool = True
 
+    def _section_cache_key(self) -> Hashable:
+        """The preferences section output depends on; blank_line_between_top only affects top-level joining."""
+        return (self.spaces_per_level, tuple(self.progression), self.fallback)
+
+    def indent_for(self, level: int) -> str:
+        return _spaces(self.spaces_per_level * level)
+
     def style_for_level(self, level: int) -> str:
         return self.progression[level] if level < len(self.progression) else self.fallback
 
     def bullet_from_style(self, style: Optional[str], idx: int) -> str:
         if style is None:
             return ""
-        if style == "number":
-            return f"{idx}. "
-        if style == "dash":
-            return "- "
-        if style == "star":
-            return "* "
-        if style == "loweralpha":
-            n = idx
-            out = []
-            while n > 0:
-                n, r = divmod(n - 1, 26)
-                out.append(chr(ord("a") + r))
-            return "".join(reversed(out)) + ". "
-        return style if style.endswith(" ") else style + " "
+        constant = _CONSTANT_BULLETS.get(style)
+        if constant is not None:
+            return constant
+        indexed = _INDEXED_BULLETS.get(style)
+        if indexed is not None:
+            return indexed(idx)
+        return _custom_bullet(style)
 
     def bullet(self, level: int, idx: int) -> str:
         return self.bullet_from_style(self.style_for_level(level), idx)
@@ -46,5 +91,3 @@ class IndentationPreferences:
             return self.fallback
         except ValueError:
             return self.progression[0]
-
-
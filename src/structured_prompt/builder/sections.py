@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import inspect
+import weakref
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Sequence, Tuple, Union, cast
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union, cast
 
 from .helpers import (
     _CriticalStep,
@@ -11,8 +13,8 @@ from .helpers import (
     _norm_key,
     _title_from_key,
 )
-from .items import Item, ItemLike, PromptText, _as_item
-from .preferences import IndentationPreferences
+from .items import Item, ItemLike, PromptText, _as_item, _emit_text, _text_edits
+from .preferences import _INDEXED_STYLES, IndentationPreferences, _spaces
 
 try:
     from dynamic_prompt.stage_contract import Stage  # type: ignore
@@ -21,6 +23,100 @@ except Exception:  # pragma: no cover
         pass
 
 
+# Positions in a PromptSection fingerprint (see PromptSection.fingerprint).
+_FP_CHILDREN = 5
+_FP_TEXTS = 6
+
+# Attributes whose change alters a section's rendered output.
+_RENDER_ATTRS = frozenset({"title", "subtitle", "bullet_style", "items"})
+
+
+class _ItemList(list):
+    """A section's item list; any mutation marks the owning section (and its ancestors) dirty."""
+
+    def __init__(self, owner: PromptSection, items: Iterable[Item] = ()):
+        super().__init__(items)
+        # Weak, so a section and its item list don't form a cycle only the GC can free.
+        self._owner = weakref.ref(owner)
+        for item in self:
+            if isinstance(item, PromptSection):
+                owner._adopt(item)
+
+    def __reduce_ex__(self, protocol):
+        # Copies and pickles carry a plain list; the owning section re-wraps it in __setstate__.
+        return (list, (list(self),))
+
+    def _changed(self, added: Iterable[Item] = ()) -> None:
+        owner = self._owner()
+        if owner is None:
+            return
+        for item in added:
+            if isinstance(item, PromptSection):
+                owner._adopt(item)
+        if owner._fp_memo is not None:
+            owner._touch()
+
+    def append(self, item):
+        list.append(self, item)
+        # Hot path while building prompts: text items need no parent link, and a section
+        # without a memoized fingerprint has nothing to invalidate.
+        owner = self._owner()
+        if owner is not None and (isinstance(item, PromptSection) or owner._fp_memo is not None):
+            self._changed((item,))
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        self._changed(items)
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed((item,))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            super().__setitem__(index, value)
+            self._changed(value)
+        else:
+            super().__setitem__(index, value)
+            self._changed((value,))
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
 @dataclass
 class PromptSection(Item):
     title: str
@@ -30,6 +126,12 @@ class PromptSection(Item):
     bullet_style: Union[str, None, bool] = True
     _subindex: Dict[str, PromptSection] = field(default_factory=dict, init=False, repr=False)
     _critical_steps: List[_CriticalStep] = field(default_factory=list, init=False, repr=False)
+    _cached_render: Optional[Tuple[Hashable, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)
+    _body_cache: Optional[Tuple[Hashable, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)
+    _fp_memo: Optional[Hashable] = field(default=None, init=False, repr=False, compare=False)
+    _fp_epoch: int = field(default=0, init=False, repr=False, compare=False)
+    _parent: Optional[weakref.ReferenceType] = field(default=None, init=False, repr=False, compare=False)
+    _more_parents: Optional[weakref.WeakValueDictionary] = field(default=None, init=False, repr=False, compare=False)
 
     def __init__(
         self,
@@ -40,19 +142,80 @@ class PromptSection(Item):
         subtitle: Optional[str] = None,
         bullet_style: Union[str, None, bool] = True,
     ):
-        self.key = _norm_key(name) if name is not None else None
-        self.title = title if title is not None else (_title_from_key(name) if name is not None else "")
-        self.subtitle = subtitle
-        self.bullet_style = bullet_style
-
-        self.items = []
-        self._subindex = {}
-        self._critical_steps = []
+        # Filled in directly: a new section has no memo or parents for __setattr__ to invalidate.
+        self.__dict__.update(
+            _fp_memo=None,
+            _fp_epoch=0,
+            _parent=None,
+            _more_parents=None,
+            key=_norm_key(name) if name is not None else None,
+            title=title if title is not None else (_title_from_key(name) if name is not None else ""),
+            subtitle=subtitle,
+            bullet_style=bullet_style,
+            _subindex={},
+            _critical_steps=[],
+            _cached_render=None,
+            _body_cache=None,
+        )
+        self.__dict__["items"] = _ItemList(self)
 
         if items:
             for it in items:
                 self.add_item(it)
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in _RENDER_ATTRS:
+            if name == "items" and not (isinstance(value, _ItemList) and value._owner() is self):
+                value = _ItemList(self, value)
+            object.__setattr__(self, name, value)
+            self._touch()
+        else:
+            object.__setattr__(self, name, value)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_parent"] = None
+        state["_more_parents"] = None
+        state["_fp_memo"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.items = list(state.get("items", ()))
+
+    def _adopt(self, child: PromptSection) -> None:
+        """Register self as a parent of `child` so its changes propagate up to us."""
+        # Nearly every section has one parent, kept in a single weak slot that a dead parent
+        # simply gives up; a section shared by several live parents records the others in a
+        # dict keyed by id() (sections are unhashable), whose entries vanish with the parent.
+        ref = child._parent
+        first = ref() if ref is not None else None
+        if first is None:
+            child.__dict__["_parent"] = weakref.ref(self)
+        elif first is not self:
+            more = child._more_parents
+            if more is None:
+                more = child.__dict__["_more_parents"] = weakref.WeakValueDictionary()
+            more[id(self)] = self
+
+    def _touch(self) -> None:
+        """Drop the memoized fingerprint of this section and of every section containing it.
+
+        A section only memoizes its fingerprint while all of its children have theirs, so
+        an already-cleared section means its ancestors are cleared too and the walk stops.
+        """
+        if self._fp_memo is None:
+            return
+        self.__dict__["_fp_memo"] = None
+        ref = self._parent
+        if ref is not None:
+            parent = ref()
+            if parent is not None:
+                parent._touch()
+        if self._more_parents:
+            for parent in list(self._more_parents.values()):
+                parent._touch()
+
     def _propagate_stage_root_to(self, child: PromptSection) -> None:
         if hasattr(self, "_stage_root"):
             child._stage_root = getattr(self, "_stage_root", None)
@@ -69,7 +232,7 @@ class PromptSection(Item):
             return None
 
         if isinstance(item, str):
-            self.items.append(PromptText(item))
+            self.items.append(_as_item(item))
             return None
 
         if isinstance(item, tuple) and len(item) >= 1:
@@ -91,11 +254,58 @@ class PromptSection(Item):
                     sec.add_item(payload)
             return sec
 
-        self.items.append(PromptText(str(item)))
+        self.items.append(_as_item(item))
         return None
 
+    # False for subclasses that override rendering: their output may depend on state the base
+    # fingerprint does not cover, so they are never cached unless they define fingerprint().
+    _base_rendering = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._base_rendering = all(
+            getattr(cls, name) is getattr(PromptSection, name)
+            for name in ("render", "_render_lines", "_render_body", "_emit_children")
+        )
+
+    def fingerprint(self) -> Optional[Hashable]:
+        """(type, title, subtitle, bullet_style, steps, child fingerprints, texts), or None.
+
+        `texts` is the flat tuple of child texts when every child is plain PromptText (the
+        common case), else None; it travels inside the fingerprint so the renderer can emit
+        such sections without per-item dispatch and can never see texts from another state.
+        """
+        if not self._base_rendering:
+            return None
+        memo = self._fp_memo
+        if memo is not None and self._fp_epoch == _text_edits[0]:
+            return memo
+
+        children = []
+        # Memoize only when every child is tracked: plain text, or a section with its own memo.
+        memoize = True
+        text_only = True
+        for item in self.items:
+            fp = item.fingerprint()
+            if fp is None:
+                return None
+            children.append(fp)
+            if type(item) is not PromptText:
+                text_only = False
+                if memoize:
+                    memoize = isinstance(item, PromptSection) and item._fp_memo is not None
+        steps = tuple((cs.title, cs.description) for cs in self._critical_steps)
+        # Text fingerprints are (PromptText, text)
+        texts = tuple(c[1] for c in children) if text_only else None
+        fp = (type(self), self.title, self.subtitle, self.bullet_style, steps, tuple(children), texts)
+        if memoize:
+            self.__dict__["_fp_memo"] = fp
+            self.__dict__["_fp_epoch"] = _text_edits[0]
+        return fp
+
     def add_critical_step(self, title: str, description: str) -> None:
         self._critical_steps.append(_CriticalStep(title=title.strip(), description=description.strip()))
+        self._touch()
 
     def __getitem__(self, key):
         k = _norm_key(key)
@@ -131,58 +341,77 @@ class PromptSection(Item):
                 self._assign_by_path(path, value)
             return
 
+        handler = _SETITEM_HANDLERS.get(type(value)) or _setitem_handler_for(value)
+        handler(self, key, value)
+
+    def _set_section_value(self, key: Union[str, Enum, Stage, type], value: PromptSection) -> None:
         k = _norm_key(key)
+        value.key = k
+        if not value.title or value.title.lower() == "none":
+            value.title = _title_from_key(key)
+        if hasattr(self, "_stage_root"):
+            self._propagate_stage_root_to(value)
+
+        self._subindex[k] = value
+        for i, item in enumerate(self.items):
+            if isinstance(item, PromptSection) and item.key == k:
+                if hasattr(item, "_insertion_seq") and not hasattr(value, "_insertion_seq"):
+                    value._insertion_seq = item._insertion_seq
+                self.items[i] = value
+                break
+        else:
+            self.items.append(value)
 
-        if isinstance(value, PromptSection):
-            k = _norm_key(key)
-            value.key = k
-            if not value.title or value.title.lower() == "none":
-                value.title = _title_from_key(key)
+    def _set_str_value(self, key: Union[str, Enum, Stage, type], value: str) -> None:
+        k = _norm_key(key)
+        if k in self._subindex:
+            self._subindex[k].items.append(_as_item(value))
+        else:
+            new_sec = PromptSection(key, items=[_as_item(value)])
             if hasattr(self, "_stage_root"):
-                self._propagate_stage_root_to(value)
-
-            self._subindex[k] = value
-            for i, item in enumerate(self.items):
-                if isinstance(item, PromptSection) and item.key == k:
-                    if hasattr(item, "_insertion_seq") and not hasattr(value, "_insertion_seq"):
-                        value._insertion_seq = item._insertion_seq
-                    self.items[i] = value
-                    break
-            else:
-                self.items.append(value)
-            return
+                self._propagate_stage_root_to(new_sec)
+            self.items.append(new_sec)
+            self._subindex[k] = new_sec
 
-        if isinstance(value, str):
-            if k in self._subindex:
-                self._subindex[k].items.append(_as_item(value))
-            else:
-                new_sec = PromptSection(key, items=[_as_item(value)])
-                if hasattr(self, "_stage_root"):
-                    self._propagate_stage_root_to(new_sec)
-                self.items.append(new_sec)
-                self._subindex[k] = new_sec
+    def _set_tuple_value(self, key: Union[str, Enum, Stage, type], value: tuple) -> None:
+        if not (len(value) >= 2 and isinstance(value[0], str)):
+            self._extend_by_key(key, value)
             return
+        sec_title = value[0]
+        items = value[1]
+        if not isinstance(items, (list, tuple)):
+            raise TypeError("Second element of tuple must be a sequence of items")
+        subtitle = value[2] if len(value) >= 3 else None
+        items_list = [_as_item(v) for v in items]
+        new_sec = PromptSection(key, items=items_list, title=sec_title, subtitle=subtitle)
+        if hasattr(self, "_stage_root"):
+            self._propagate_stage_root_to(new_sec)
+        self._merge_section(_norm_key(key), new_sec)
 
-        if isinstance(value, tuple) and len(value) >= 2 and isinstance(value[0], str):
-            sec_title = value[0]
-            items = value[1]
-            if not isinstance(items, (list, tuple)):
-                raise TypeError("Second element of tuple must be a sequence of items")
-            subtitle = value[2] if len(value) >= 3 else None
-            items_list = [_as_item(v) for v in items]
-            new_sec = PromptSection(key, items=items_list, title=sec_title, subtitle=subtitle)
-            if hasattr(self, "_stage_root"):
-                self._propagate_stage_root_to(new_sec)
-        elif isinstance(value, (list, tuple)):
-            items_list = [_as_item(v) for v in value]
-            new_sec = PromptSection(key, items=items_list)
-            if hasattr(self, "_stage_root"):
-                self._propagate_stage_root_to(new_sec)
+    def _reject_value(self, key: Union[str, Enum, Stage, type], value: object) -> None:
+        raise TypeError(
+            "__setitem__ expects str, PromptSection, a sequence, (title, sequence), or (title, sequence, subtitle)"
+        )
+
+    def extend(self, key: Union[str, Enum, Stage, type], items: Iterable[ItemLike]) -> None:
+        """Append items to the section at `key`, creating it (and any stage ancestors) if needed.
+
+        Same as ``section[key] = [...]`` with a list, but accepts any iterable and skips the
+        value-type dispatch of ``__setitem__``. A single string is appended as one item.
+        """
+        items_list = [items] if isinstance(items, str) else list(items)
+        if _is_stage_class(key):
+            self._assign_by_path(self._path_from_stage_class(cast(type, key)), items_list)
         else:
-            raise TypeError(
-                "__setitem__ expects str, PromptSection, a sequence, (title, sequence), or (title, sequence, subtitle)"
-            )
+            self._extend_by_key(key, items_list)
 
+    def _extend_by_key(self, key: Union[str, Enum, Stage, type], items: Sequence[ItemLike]) -> None:
+        new_sec = PromptSection(key, items=[_as_item(v) for v in items])
+        if hasattr(self, "_stage_root"):
+            self._propagate_stage_root_to(new_sec)
+        self._merge_section(_norm_key(key), new_sec)
+
+    def _merge_section(self, k: str, new_sec: PromptSection) -> None:
         new_sec.key = k
         if k in self._subindex:
             existing = self._subindex[k]
@@ -200,21 +429,7 @@ class PromptSection(Item):
             str, Item, Sequence[ItemLike], Tuple[str, Sequence[ItemLike]], Tuple[str, Sequence[ItemLike], str]
         ],
     ) -> None:
-        cur = self
-        for name in path[:-1]:
-            sec = cur[name]
-            if not sec.title:
-                sec.title = _title_from_key(name)
-            if not sec.key:
-                sec.key = _norm_key(name)
-            cur = sec
-
-        leaf_key_obj = path[-1] if path else "Section"
-        leaf = cur[leaf_key_obj]
-        if not leaf.title:
-            leaf.title = _title_from_key(leaf_key_obj)
-        if not leaf.key:
-            leaf.key = _norm_key(leaf_key_obj)
+        leaf = self._descend(path if path else ["Section"])
 
         if path and hasattr(self, "_register_top_stage_from_class"):
             first = path[0]
@@ -226,21 +441,24 @@ class PromptSection(Item):
         self._append_into_section(leaf, value)
 
     def _path_from_stage_class(self, cls: type) -> List[str]:
-        qual = getattr(cls, "__qualname__", "")
-        parts = qual.split(".")
-        if not parts:
-            return []
-        return parts[1:] if len(parts) > 1 else parts
+        return list(_stage_path(cls))
 
-    def _set_section_by_path(self, path: List[object], new_sec: PromptSection) -> None:  # shared impl
-        parent: PromptSection = self
-        for name in path[:-1]:
-            sec = parent[name]
+    def _descend(self, path: Sequence[object]) -> PromptSection:
+        """Walk `path` below self in one pass, creating missing sections, and return the last one."""
+        cur: PromptSection = self
+        for name in path:
+            sec = cur._subindex.get(_norm_key(name))
+            if sec is None:
+                sec = cur[name]
             if not sec.title:
                 sec.title = _title_from_key(name)
             if not sec.key:
                 sec.key = _norm_key(name)
-            parent = sec
+            cur = sec
+        return cur
+
+    def _set_section_by_path(self, path: List[object], new_sec: PromptSection) -> None:  # shared impl
+        parent = self._descend(path[:-1])
 
         leaf_key_obj = path[-1] if path else "Section"
         leaf_key = _norm_key(leaf_key_obj)
@@ -274,6 +492,37 @@ class PromptSection(Item):
         prev_style: Optional[str],
         ignore_bullets: bool,
     ) -> str:
+        return "\n".join(
+            self._render_lines(
+                self.fingerprint(),
+                idx=idx,
+                level=level,
+                prefs=prefs,
+                prev_style=prev_style,
+                ignore_bullets=ignore_bullets,
+            )
+        )
+
+    def _render_lines(
+        self,
+        fp: Optional[Hashable],
+        *,
+        idx: int,
+        level: int,
+        prefs: IndentationPreferences,
+        prev_style: Optional[str],
+        ignore_bullets: bool,
+    ) -> Tuple[str, ...]:
+        """Render to output lines, reusing the last result of an unchanged subtree.
+
+        Children contribute their lines to a single flat list, so the whole tree is joined
+        exactly once by the caller instead of once per nesting level.
+        """
+        key = None if fp is None else (fp, idx, level, prefs._section_cache_key(), prev_style, ignore_bullets)
+        cached = self._cached_render
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+
         if ignore_bullets:
             heading_prefix = ""
             cur_style_for_children = prev_style
@@ -282,37 +531,135 @@ class PromptSection(Item):
             heading_prefix = prefs.bullet_from_style(cur_style, idx)
             cur_style_for_children = cur_style
 
-        left = " " * (prefs.spaces_per_level * level)
-        hang = " " * (prefs.spaces_per_level * level + len(heading_prefix))
-        heading = self.title
-        lines = [left + heading_prefix + heading]
+        left = prefs.indent_for(level)
+        heading = f"{left}{heading_prefix}{self.title}"
+
+        # The body does not depend on the item index (only on the bullet width), so a section
+        # that is merely renumbered keeps its body and only rebuilds the heading line.
+        body_key = None if fp is None else (fp, level, prefs._section_cache_key(), cur_style_for_children, len(heading_prefix))
+        body_cached = self._body_cache
+        if body_key is not None and body_cached is not None and body_cached[0] == body_key:
+            body = body_cached[1]
+        else:
+            body = self._render_body(
+                fp,
+                level=level,
+                prefs=prefs,
+                hang=_spaces(len(left) + len(heading_prefix)),
+                cur_style_for_children=cur_style_for_children,
+            )
+            self.__dict__["_body_cache"] = (body_key, body) if body_key is not None else None
+
+        rendered = (heading,) + body
+        self.__dict__["_cached_render"] = (key, rendered) if key is not None else None
+        return rendered
+
+    def _render_body(
+        self,
+        fp: Optional[Hashable],
+        *,
+        level: int,
+        prefs: IndentationPreferences,
+        hang: str,
+        cur_style_for_children: Optional[str],
+    ) -> Tuple[str, ...]:
+        """Render everything below the heading line: critical steps, subtitle and children."""
+        lines: List[str] = []
 
         for cs in self._critical_steps:
             desc_lines = cs.description.splitlines() or [""]
-            lines.append(hang + f"!!! MANDATORY STEP [{cs.title}] !!!")
-            for dl in desc_lines:
-                lines.append(hang + dl.strip())
-            lines.append(hang + "!!! END MANDATORY STEP !!!")
+            lines.append(f"{hang}!!! MANDATORY STEP [{cs.title}] !!!")
+            lines.extend(hang + dl.strip() for dl in desc_lines)
+            lines.append(f"{hang}!!! END MANDATORY STEP !!!")
 
         if self.subtitle:
             lines.append(hang + inspect.cleandoc(self.subtitle))
 
         next_level = level + 1
-        children_ignore = self.bullet_style is None or len(self.items) == 1
+        items = self.items
+        child_left = prefs.indent_for(next_level)
+        if len(items) == 1 and type(items[0]) is PromptText:
+            # Hot path: a lone text child never gets a bullet, so skip style resolution entirely.
+            _emit_text(lines, items[0].text, child_left, "", _spaces(len(child_left) + 2))
+        elif self.bullet_style is None or len(items) == 1:
+            self._emit_children(
+                lines,
+                fp,
+                next_level=next_level,
+                prefs=prefs,
+                prev_style=cur_style_for_children,
+                ignore_bullets=True,
+                child_style=None,
+                child_left=child_left,
+                text_prefix="",
+                text_hang=_spaces(len(child_left) + 2),  # 2 spaces for hanging indent
+            )
+        else:
+            # Text children share one indent and, unless the style is indexed, one bullet prefix;
+            # resolve them once per section instead of once per item.
+            child_style = prefs.next_style(cur_style_for_children)
+            text_prefix: Optional[str] = None
+            text_hang = ""
+            if child_style not in _INDEXED_STYLES:
+                text_prefix = prefs.bullet_from_style(child_style, 0)
+                text_hang = _spaces(len(child_left) + len(text_prefix))
+            self._emit_children(
+                lines,
+                fp,
+                next_level=next_level,
+                prefs=prefs,
+                prev_style=cur_style_for_children,
+                ignore_bullets=False,
+                child_style=child_style,
+                child_left=child_left,
+                text_prefix=text_prefix,
+                text_hang=text_hang,
+            )
+        return tuple(lines)
 
+    def _emit_children(
+        self,
+        lines: List[str],
+        fp: Optional[Hashable],
+        *,
+        next_level: int,
+        prefs: IndentationPreferences,
+        prev_style: Optional[str],
+        ignore_bullets: bool,
+        child_style: Optional[str],
+        child_left: str,
+        text_prefix: Optional[str],
+        text_hang: str,
+    ) -> None:
+        """Append every child's lines; `text_prefix` is None when text bullets vary by index."""
+        texts = fp[_FP_TEXTS] if fp is not None else None  # type: ignore[index]
+        if texts is not None and text_prefix is not None:
+            for text in texts:
+                _emit_text(lines, text, child_left, text_prefix, text_hang)
+            return
+
+        # fp is (..., child fingerprints); hand them down so each subtree is fingerprinted once
+        child_fps = fp[_FP_CHILDREN] if fp is not None else None  # type: ignore[index]
         for i, child in enumerate(self.items, 1):
-            lines.append(
-                child.render(
+            if type(child) is PromptText:
+                if text_prefix is not None:
+                    _emit_text(lines, child.text, child_left, text_prefix, text_hang)
+                else:
+                    prefix = prefs.bullet_from_style(child_style, i)
+                    _emit_text(lines, child.text, child_left, prefix, _spaces(len(child_left) + len(prefix)))
+                continue
+            lines.extend(
+                _item_lines(
+                    child,
+                    child_fps[i - 1] if child_fps is not None else None,
                     idx=i,
                     level=next_level,
                     prefs=prefs,
-                    prev_style=cur_style_for_children,
-                    ignore_bullets=children_ignore,
+                    prev_style=prev_style,
+                    ignore_bullets=ignore_bullets,
                 )
             )
 
-        return "\n".join(lines)
-
     def _append_into_section(
         self,
         section: PromptSection,
@@ -347,5 +694,60 @@ class PromptSection(Item):
             section.items.append(_as_item(it))
 
 
-
-
+_SetItemHandler = Callable[[PromptSection, Any, Any], None]
+
+# __setitem__ dispatches on the exact type of the assigned value; subclasses of these
+# types are resolved by _setitem_handler_for().
+_SETITEM_HANDLERS: Dict[type, _SetItemHandler] = {
+    str: PromptSection._set_str_value,
+    list: PromptSection._extend_by_key,
+    tuple: PromptSection._set_tuple_value,
+    PromptSection: PromptSection._set_section_value,
+}
+
+
+def _setitem_handler_for(value: object) -> _SetItemHandler:
+    if isinstance(value, PromptSection):
+        return PromptSection._set_section_value
+    if isinstance(value, str):
+        return PromptSection._set_str_value
+    if isinstance(value, tuple):
+        return PromptSection._set_tuple_value
+    if isinstance(value, list):
+        return PromptSection._extend_by_key
+    return PromptSection._reject_value
+
+
+@lru_cache(maxsize=256)
+def _stage_path(cls: type) -> Tuple[str, ...]:
+    """Names of a stage class's nesting below the stage root, e.g. Stages.Output.Rules -> ("Output", "Rules")."""
+    parts = getattr(cls, "__qualname__", "").split(".")
+    return tuple(parts[1:] if len(parts) > 1 else parts)
+
+
+def _item_lines(
+    item: Item,
+    fp: Optional[Hashable],
+    *,
+    idx: int,
+    level: int,
+    prefs: IndentationPreferences,
+    prev_style: Optional[str],
+    ignore_bullets: bool,
+) -> Sequence[str]:
+    """Render an item to output lines, handing a precomputed fingerprint down to plain sections."""
+    render = type(item).render
+    if render is PromptSection.render:
+        return cast(PromptSection, item)._render_lines(
+            fp if fp is not None else item.fingerprint(),
+            idx=idx,
+            level=level,
+            prefs=prefs,
+            prev_style=prev_style,
+            ignore_bullets=ignore_bullets,
+        )
+    if render is PromptText.render:
+        return cast(PromptText, item)._render_lines(
+            idx=idx, level=level, prefs=prefs, prev_style=prev_style, ignore_bullets=ignore_bullets
+        )
+    return [item.render(idx=idx, level=level, prefs=prefs, prev_style=prev_style, ignore_bullets=ignore_bullets)]
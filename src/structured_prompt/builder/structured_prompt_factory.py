@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import inspect
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Sequence, Tuple, Union
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from .helpers import _is_stage_class, _key_variants, _try_import_generated_stages
 from .items import Item
 from .preferences import IndentationPreferences
-from .sections import PromptSection
+from .sections import PromptSection, _item_lines
+
+if TYPE_CHECKING:
+    from _typeshed import SupportsWrite
 
 
 @dataclass
@@ -19,6 +23,7 @@ class StructuredPromptFactory(PromptSection):
 
     _top_order_map: Dict[str, Tuple[int, bool]] = field(init=False, default_factory=dict)
     _insertion_seq_counter: int = field(init=False, default=0)
+    _render_cache: Optional[Tuple[Hashable, str]] = field(init=False, default=None, repr=False, compare=False)
 
     def __init__(
         self,
@@ -50,22 +55,11 @@ class StructuredPromptFactory(PromptSection):
             self._top_order_map.update(topo)
 
         self._insertion_seq_counter = 0
+        self._render_cache = None
 
     def _build_top_order_map_from_stages(self, stages_root: type) -> Dict[str, Tuple[int, bool]]:
         """Build top_order_map from a Stages class with stage definitions."""
-        top_map: Dict[str, Tuple[int, bool]] = {}
-
-        for idx, (nm, obj) in enumerate(stages_root.__dict__.items()):
-            if isinstance(obj, type) and hasattr(obj, "__stage_display__"):
-                fixed = bool(getattr(obj, "__order_fixed__", True))  # Default to True (fixed ordering)
-                order_index = int(getattr(obj, "__order_index__", idx))
-                class_key = nm.strip().lower()
-                display = getattr(obj, "__stage_display__", nm)
-                display_key = display.strip().lower()
-                for k in set(_key_variants(class_key) + _key_variants(display_key)):
-                    top_map[k] = (order_index, fixed)
-
-        return top_map
+        return dict(_top_order_map_for(stages_root))
 
     def _register_top_stage_from_class(self, cls: type, section: PromptSection) -> None:
         if not _is_stage_class(cls):
@@ -160,35 +154,123 @@ class StructuredPromptFactory(PromptSection):
         """Set the role field that will be rendered before the rest of the prompt as **Role**."""
         self.role = inspect.cleandoc(role)
 
-    def render_prompt(self) -> str:
-        parts: List[str] = []
+    def _render_key(self, section_fps: List[Optional[Hashable]], blank_between: bool) -> Optional[Hashable]:
+        """Structural fingerprint of the rendered prompt, or None if some section is not cacheable."""
+        if any(fp is None for fp in section_fps):
+            return None
+        steps = tuple((cs.title, cs.description) for cs in self._critical_steps)
+        return (self.prefs._section_cache_key(), blank_between, self.role, self.prologue, steps, tuple(section_fps))
+
+    def _iter_lines(
+        self, top_sorted: List[PromptSection], section_fps: List[Optional[Hashable]], blank_between: bool
+    ) -> Iterator[str]:
+        """Yield the prompt line by line; cached section lines are passed through without copying."""
         if self.role:
-            parts.append(f"**{self.role.strip()}**")
-            parts.append("")
+            yield f"**{self.role.strip()}**"
+            yield ""
 
         if self.prologue:
-            parts.append(self.prologue.strip())
-            parts.append("")
+            yield self.prologue.strip()
+            yield ""
 
         if getattr(self, "_critical_steps", None):
             for cs in self._critical_steps:
                 desc_lines = cs.description.splitlines() or [""]
-                parts.append(f"!!! MANDATORY STEP [{cs.title}] !!!")
+                yield f"!!! MANDATORY STEP [{cs.title}] !!!"
                 for dl in desc_lines:
-                    parts.append(dl.strip())
-                parts.append("!!! END MANDATORY STEP !!!")
-            parts.append("")
-
+                    yield dl.strip()
+                yield "!!! END MANDATORY STEP !!!"
+            yield ""
+
+        for idx, (child, fp) in enumerate(zip(top_sorted, section_fps), start=1):
+            yield from _item_lines(child, fp, idx=idx, level=0, prefs=self.prefs, prev_style=None, ignore_bullets=False)
+            if blank_between:
+                yield ""
+
+    def _prepare_render(
+        self, blank_between: bool
+    ) -> Tuple[List[PromptSection], List[Optional[Hashable]], Optional[Hashable]]:
         top_sections: List[PromptSection] = [sec for sec in self.items if isinstance(sec, PromptSection)]
 
         for sec in top_sections:
             self._ensure_top_section_registered(sec)
 
         top_sorted: List[PromptSection] = self._order_top_sections(top_sections)
+        section_fps = [sec.fingerprint() for sec in top_sorted]
+        return top_sorted, section_fps, self._render_key(section_fps, blank_between)
 
-        for idx, child in enumerate(top_sorted, start=1):
-            parts.append(child.render(idx=idx, level=0, prefs=self.prefs, prev_style=None, ignore_bullets=False))
-            if self.prefs.blank_line_between_top:
-                parts.append("")
+    def _cached_text(self, key: Optional[Hashable]) -> Optional[str]:
+        cached = self._render_cache
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+        return None
 
-        return "\n".join(parts).rstrip()
+    def _blank_between(self, override: Optional[bool]) -> bool:
+        return self.prefs.blank_line_between_top if override is None else override
+
+    def render_prompt(self, *, blank_line_between_top: Optional[bool] = None) -> str:
+        """Render the prompt to a string.
+
+        `blank_line_between_top` overrides the preference of the same name for this call only;
+        section output is shared between both layouts, so only the top-level joining differs.
+        """
+        blank_between = self._blank_between(blank_line_between_top)
+        top_sorted, section_fps, key = self._prepare_render(blank_between)
+
+        # Re-rendering an unchanged prompt returns the previous string as-is.
+        cached = self._cached_text(key)
+        if cached is not None:
+            return cached
+
+        rendered = "\n".join(self._iter_lines(top_sorted, section_fps, blank_between)).rstrip()
+        self._render_cache = (key, rendered) if key is not None else None
+        return rendered
+
+    def render_to(self, out: SupportsWrite[str], *, blank_line_between_top: Optional[bool] = None) -> None:
+        """Write the rendered prompt to a text stream without building the full string first.
+
+        The output is identical to render_prompt() with the same arguments. If the prompt has not
+        changed since it was last rendered, the cached string is written as-is.
+        """
+        blank_between = self._blank_between(blank_line_between_top)
+        top_sorted, section_fps, key = self._prepare_render(blank_between)
+        cached = self._cached_text(key)
+        if cached is not None:
+            out.write(cached)
+            return
+
+        # Trailing whitespace is held back until more text follows, matching render_prompt()'s rstrip().
+        pending: List[str] = []
+        sep = ""
+        for line in self._iter_lines(top_sorted, section_fps, blank_between):
+            body = line.rstrip()
+            if body:
+                if pending:
+                    out.write("".join(pending))
+                    pending.clear()
+                out.write(sep)
+                out.write(body)
+                if len(body) < len(line):
+                    pending.append(line[len(body) :])
+            else:
+                pending.append(sep)
+                pending.append(line)
+            sep = "\n"
+
+
+@lru_cache(maxsize=32)
+def _top_order_map_for(stages_root: type) -> Dict[str, Tuple[int, bool]]:
+    """Walk a Stages class once; every factory built over the same root copies the result."""
+    top_map: Dict[str, Tuple[int, bool]] = {}
+
+    for idx, (nm, obj) in enumerate(stages_root.__dict__.items()):
+        if isinstance(obj, type) and hasattr(obj, "__stage_display__"):
+            fixed = bool(getattr(obj, "__order_fixed__", True))  # Default to True (fixed ordering)
+            order_index = int(getattr(obj, "__order_index__", idx))
+            class_key = nm.strip().lower()
+            display = getattr(obj, "__stage_display__", nm)
+            display_key = display.strip().lower()
+            for k in set(_key_variants(class_key) + _key_variants(display_key)):
+                top_map[k] = (order_index, fixed)
+
+    return top_map
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
-# Thin compatibility shim: re-export public API from the structured builder package
-from .builder import (
-    IndentationPreferences,
-    Item,
-    ItemLike,
-    PromptSection,
-    PromptText,
-    StructuredPromptFactory,
-)
+from typing import TYPE_CHECKING, Any, List
+
+# Thin compatibility shim: lazily re-export public API from the structured builder package.
+# Names are resolved on first access (PEP 562) and cached into the module namespace.
+if TYPE_CHECKING:
+    from .builder import (
+        IndentationPreferences,
+        Item,
+        ItemLike,
+        PromptSection,
+        PromptText,
+        StructuredPromptFactory,
+    )
 
 __all__ = [
     "IndentationPreferences",
@@ -18,3 +22,17 @@ __all__ = [
     "StructuredPromptFactory",
     "ItemLike",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        from . import builder
+
+        value = getattr(builder, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
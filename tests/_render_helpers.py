@@ -0,0 +1,45 @@
+"""Helpers for line-oriented assertions on rendered prompts; use `in rp.text` for substrings."""
+
+from typing import Dict, List, Optional
+
+
+class RenderedPrompt:
+    """Renders a prompt once and indexes its lines for lookups and ordering checks."""
+
+    __slots__ = ("text", "lines", "stripped")
+
+    def __init__(self, prompt) -> None:
+        self.text: str = prompt.render_prompt()
+        self.lines: List[str] = self.text.splitlines()
+        self.stripped: List[str] = [line.strip() for line in self.lines]
+
+    def index_of_prefix(self, prefix: str) -> Optional[int]:
+        """Index of the first line whose stripped form starts with `prefix`."""
+        for i, line in enumerate(self.stripped):
+            if line.startswith(prefix):
+                return i
+        return None
+
+    def index_of_prefixes(self, *prefixes: str) -> Dict[str, int]:
+        """Index of the first line starting with each prefix, scanning once and stopping when all are found.
+
+        Prefixes that never match are absent from the result.
+        """
+        found: Dict[str, int] = {}
+        pending = list(prefixes)
+        for i, line in enumerate(self.stripped):
+            for prefix in pending:
+                if line.startswith(prefix):
+                    found[prefix] = i
+                    pending.remove(prefix)
+                    break
+            if not pending:
+                break
+        return found
+
+    def index_containing(self, fragment: str) -> Optional[int]:
+        """Index of the first line containing `fragment`."""
+        for i, line in enumerate(self.lines):
+            if fragment in line:
+                return i
+        return None
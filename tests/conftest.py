@@ -0,0 +1,11 @@
+import pytest
+
+from structured_prompt import StructuredPromptFactory
+
+from .stubs.prompt_structure import Stages
+
+
+@pytest.fixture
+def prompt():
+    """Fresh factory over the stub Stages tree; the tree walk itself is cached per stage root."""
+    return StructuredPromptFactory(stage_root=Stages)
@@ -1,17 +1,35 @@
+import copy
+import dataclasses
+import io
+import pickle
+import subprocess
+import sys
+import weakref
+
 import pytest
 
 from structured_prompt import IndentationPreferences, PromptSection, PromptText, StructuredPromptFactory
 
+from ._render_helpers import RenderedPrompt
 from .stubs.prompt_structure import Stages
 
 
+@dataclasses.dataclass
+class TaggedText(PromptText):
+    tag: str = "none"
+
+
+class StyledText(PromptText):
+    def __init__(self, text, style):
+        super().__init__(text)
+        self.style = style
+
+
 class TestDynamicPromptBuilder:
     """Test suite for the dynamic prompt builder covering all acceptance examples."""
 
-    def test_1_append_when_setting_array_value(self):
+    def test_1_append_when_setting_array_value(self, prompt):
         """Test that assigning a List[ItemLike] to a section appends items."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # First assignment
         prompt[Stages.AdaptiveExecution] = [
             PromptSection(
@@ -44,10 +62,39 @@ class TestDynamicPromptBuilder:
             in rendered
         )
 
-    def test_2_replace_when_setting_prompt_section_object(self):
-        """Test that assigning a PromptSection directly replaces that section."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
+    def test_extend_appends_items_from_iterable(self, prompt):
+        """Test that extend() appends like list assignment and accepts generators."""
+        prompt.extend(Stages.AdaptiveExecution, ["First rule", "Second rule"])
+        prompt.extend(Stages.AdaptiveExecution, (f"Generated rule {i}" for i in range(2)))
+        prompt.extend(Stages.Output.OutputTemplateRules, ["Always format answers using valid Markdown."])
+        prompt["CustomStage"] = ["Custom content"]
+        prompt.extend("CustomStage", iter(["More custom content"]))
+
+        rendered = prompt.render_prompt()
 
+        assert "- First rule" in rendered
+        assert "- Second rule" in rendered
+        assert "- Generated rule 0" in rendered
+        assert "- Generated rule 1" in rendered
+        assert "Output Template Rules" in rendered
+        assert "Always format answers using valid Markdown." in rendered
+        assert "- Custom content" in rendered
+        assert "- More custom content" in rendered
+        assert len(prompt[Stages.AdaptiveExecution].items) == 4
+
+    def test_extend_with_string_appends_one_item(self, prompt):
+        """Test that extend() treats a plain string as a single item, not as characters."""
+        prompt.extend(Stages.Objective, "abc")
+        prompt.extend("CustomStage", "Custom content")
+
+        assert len(prompt[Stages.Objective].items) == 1
+        assert len(prompt["CustomStage"].items) == 1
+        rendered = RenderedPrompt(prompt)
+        assert "abc" in rendered.stripped
+        assert "Custom content" in rendered.stripped
+
+    def test_2_replace_when_setting_prompt_section_object(self, prompt):
+        """Test that assigning a PromptSection directly replaces that section."""
         # First assignment
         prompt[Stages.QualityGates] = [
             "Coverage: Start with tracing, then metrics, then infra; do not skip layers without a reason.",
@@ -78,10 +125,8 @@ class TestDynamicPromptBuilder:
         )
         assert "Corroboration: Cite ≥2 independent signals for high confidence." in rendered
 
-    def test_3_append_when_setting_string_value(self):
+    def test_3_append_when_setting_string_value(self, prompt):
         """Test that assigning a plain str to a stage key appends it as PromptText."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.Output][Stages.Output.OutputTemplateRules] = [
             "Always format answers using valid Markdown.",
             "Use **bold** or *italic* for emphasis",
@@ -97,10 +142,8 @@ class TestDynamicPromptBuilder:
         assert "Use **bold** or *italic* for emphasis" in rendered
         assert "Use headings (#, ##, etc.)" in rendered
 
-    def test_4_take_key_value_from_dictionary_key(self):
+    def test_4_take_key_value_from_dictionary_key(self, prompt):
         """Test that section key is derived from dictionary key and title from display."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.Output][Stages.Output.OutputTemplate] = [
             "Incident Scope",
             "Root Cause",
@@ -114,10 +157,8 @@ class TestDynamicPromptBuilder:
         assert "Incident Scope" in rendered
         assert "Root Cause" in rendered
 
-    def test_5_hierarchical_addressing_with_and_without_explicit_parent(self):
+    def test_5_hierarchical_addressing_with_and_without_explicit_parent(self, prompt):
         """Test that deep stage references auto-create ancestors."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Direct deep reference
         prompt[Stages.Output.OutputTemplateRules] = ["Always format answers using valid Markdown."]
 
@@ -132,10 +173,8 @@ class TestDynamicPromptBuilder:
         assert "Always format answers using valid Markdown." in rendered
         assert "Use headings (#, ##, etc.)" in rendered
 
-    def test_6_nested_sections_created_with_prompt_section_value(self):
+    def test_6_nested_sections_created_with_prompt_section_value(self, prompt):
         """Test that PromptSection allows embedding subsections in one shot."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.AdaptiveExecution] = [
             PromptSection(
                 Stages.AdaptiveExecution.SpecialCases,
@@ -167,10 +206,8 @@ class TestDynamicPromptBuilder:
         assert "Purpose: identify overlooked infra issues." in rendered
         assert "Document in execution_log whether you took this action and why." in rendered
 
-    def test_7_bullet_style_control_no_bullets_for_children(self):
+    def test_7_bullet_style_control_no_bullets_for_children(self, prompt):
         """Test that bullet_style=None suppresses bullets for children while maintaining indentation."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.ToolReference] = PromptSection(
             bullet_style=None,  # suppress bullets for children
             subtitle="RULE: [name|purpose|required_inputs|notes]",
@@ -192,10 +229,8 @@ class TestDynamicPromptBuilder:
         assert "[metrics|scale & correlation|objective,scope|RUN_AFTER_TRACING]" in rendered
         assert "[infra|infra-level RCA|objective,scope|RUN_LAST]" in rendered
 
-    def test_8_fixed_top_level_ordering(self):
+    def test_8_fixed_top_level_ordering(self, prompt):
         """Test that fixed-order top-level stages render in canonical order regardless of assignment time."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Order of assignments is intentionally shuffled
         prompt[Stages.Planning] = ["Plan step A"]
         prompt[Stages.QualityGates] = ["Gate A"]
@@ -203,24 +238,14 @@ class TestDynamicPromptBuilder:
         prompt[Stages.ToolReference] = ["[tracing|...]", "[metrics|...]", "[infra|...]"]
         prompt[Stages.Scoping] = ["Define scope"]
 
-        rendered = prompt.render_prompt()
+        rp = RenderedPrompt(prompt)
 
         # Find the positions of each section
-        lines = rendered.split("\n")
-        planning_idx = None
-        quality_gates_idx = None
-        tool_reference_idx = None
-        scoping_idx = None
-
-        for i, line in enumerate(lines):
-            if line.strip().startswith("1. Tool Reference"):
-                tool_reference_idx = i
-            elif line.strip().startswith("2. Scoping"):
-                scoping_idx = i
-            elif line.strip().startswith("3. Planning"):
-                planning_idx = i
-            elif line.strip().startswith("4. Quality Gates"):
-                quality_gates_idx = i
+        indices = rp.index_of_prefixes("1. Tool Reference", "2. Scoping", "3. Planning", "4. Quality Gates")
+        tool_reference_idx = indices.get("1. Tool Reference")
+        scoping_idx = indices.get("2. Scoping")
+        planning_idx = indices.get("3. Planning")
+        quality_gates_idx = indices.get("4. Quality Gates")
 
         # Verify all sections are found
         assert planning_idx is not None, "Planning section not found"
@@ -262,10 +287,8 @@ class TestDynamicPromptBuilder:
         assert "If specific issues are provided, investigate ONLY those." in rendered
         assert "Record incident summary and objective." in rendered
 
-    def test_10_mixing_prompt_text_str_and_nested_sections(self):
+    def test_10_mixing_prompt_text_str_and_nested_sections(self, prompt):
         """Test that any ItemLike is acceptable: PromptText, plain strings, or nested PromptSection objects."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.Output] = [
             PromptText("Use Markdown throughout."),
             PromptSection("Output Template", items=["Incident Scope", "Root Cause", "Evidence"]),
@@ -304,6 +327,27 @@ class TestDynamicPromptBuilder:
         assert "        * Section 1" in rendered
         assert "        * Section 2" in rendered
 
+    def test_indexed_bullets_past_single_letters(self):
+        """Test that number and loweralpha bullets keep counting past 26 items."""
+        prefs = IndentationPreferences(progression=("number", "loweralpha"))
+        section = PromptSection("List", items=[f"Item {n}" for n in range(1, 29)])
+        rendered = section.render(idx=1, level=0, prefs=prefs, prev_style=None, ignore_bullets=False)
+
+        assert rendered.startswith("1. List")
+        assert "  z. Item 26" in rendered
+        assert "  aa. Item 27" in rendered
+        assert "  ab. Item 28" in rendered
+
+    def test_custom_bullet_styles_in_progression(self):
+        """Test that custom style tokens progress and render like the built-in styles."""
+        prefs = IndentationPreferences(progression=("→", "dash"), fallback="star")
+
+        assert prefs.next_style(None) == "→"
+        assert prefs.next_style("→") == "dash"
+        assert prefs.next_style("dash") == "star"
+        assert prefs.next_style("unknown") == "→"
+        assert prefs.bullet_from_style("→", 3) == "→ "
+
     def test_blank_line_between_top_preference(self):
         """Test blank_line_between_top preference."""
         # Test with blank lines between top sections
@@ -327,10 +371,39 @@ class TestDynamicPromptBuilder:
         # Verify the difference
         assert rendered_with_blanks.count("\n\n") > rendered_without_blanks.count("\n\n")
 
-    def test_arbitrary_stage_names(self):
-        """Test that arbitrary stage names can be used alongside canonical stages."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
+    def test_blank_line_between_top_override(self, prompt):
+        """Test that render_prompt() can override blank_line_between_top for a single call."""
+        prompt[Stages.Output] = ["Test output"]
+        prompt[Stages.QualityGates] = ["Test gates"]
+
+        with_blanks = prompt.render_prompt()
+        without_blanks = prompt.render_prompt(blank_line_between_top=False)
 
+        assert prompt.prefs.blank_line_between_top is True
+        assert with_blanks.count("\n\n") > without_blanks.count("\n\n")
+        assert without_blanks == with_blanks.replace("\n\n", "\n")
+        assert prompt.render_prompt() == with_blanks
+
+        out = io.StringIO()
+        prompt.render_to(out, blank_line_between_top=False)
+        assert out.getvalue() == without_blanks
+
+    def test_toggling_blank_line_between_top_keeps_section_renders(self, prompt):
+        """Test that blank_line_between_top only changes top-level joining, not cached section output."""
+        prompt[Stages.Output] = ["Test output", "More output"]
+        prompt[Stages.QualityGates] = ["Test gates"]
+        with_blanks = prompt.render_prompt()
+
+        prompt.prefs.blank_line_between_top = False
+        without_blanks = prompt.render_prompt()
+        assert without_blanks == with_blanks.replace("\n\n", "\n")
+        assert prompt.render_prompt() is without_blanks
+
+        prompt.prefs.blank_line_between_top = True
+        assert prompt.render_prompt() == with_blanks
+
+    def test_arbitrary_stage_names(self, prompt):
+        """Test that arbitrary stage names can be used alongside canonical stages."""
         # Use canonical stage
         prompt[Stages.Output] = ["Canonical content"]
 
@@ -347,10 +420,8 @@ class TestDynamicPromptBuilder:
         assert "2. Output" in rendered
         assert "Canonical content" in rendered
 
-    def test_nested_arbitrary_stages(self):
+    def test_nested_arbitrary_stages(self, prompt):
         """Test nested arbitrary stages."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt["MainStage"] = [PromptSection("SubStage", items=["Sub content"]), "Main content"]
 
         rendered = prompt.render_prompt()
@@ -361,10 +432,8 @@ class TestDynamicPromptBuilder:
         assert "Sub content" in rendered
         assert "Main content" in rendered
 
-    def test_stage_root_inheritance(self):
+    def test_stage_root_inheritance(self, prompt):
         """Test that nested sections inherit stage_root from parent."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Create a nested section that should inherit stage_root
         nested_section = PromptSection("Nested", items=["Nested content"])
         prompt["ParentStage"] = [nested_section]
@@ -374,56 +443,32 @@ class TestDynamicPromptBuilder:
         # Note: stage_root is None by default when not explicitly provided
         # The actual stage_root functionality would need to be set explicitly
 
-    def test_multiline_text_rendering(self):
+    def test_multiline_text_rendering(self, prompt):
         """Test that multiline text is rendered with proper hanging indentation."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         multiline_text = """This is a multiline text
 that should be rendered with proper
 hanging indentation for continuation lines."""
 
         prompt[Stages.Output] = [multiline_text]
 
-        rendered = prompt.render_prompt()
+        rp = RenderedPrompt(prompt)
 
         # Verify the first line has a bullet
-        assert "This is a multiline text" in rendered
-
-        # Verify continuation lines are properly indented
-        lines = rendered.split("\n")
-        output_section_lines = []
-        in_output_section = False
+        assert "This is a multiline text" in rp.text
 
-        for line in lines:
-            if line.strip().startswith("1. Output"):
-                in_output_section = True
-            elif in_output_section and line.strip().startswith("2."):
-                break
-            elif in_output_section:
-                output_section_lines.append(line)
-
-        # Find the multiline text and verify hanging indentation
-        multiline_found = False
-        for i, line in enumerate(output_section_lines):
-            if "This is a multiline text" in line:
-                multiline_found = True
-                # Check that continuation lines have proper indentation
-                if (
-                    i + 1 < len(output_section_lines)
-                    and "that should be rendered with proper" in output_section_lines[i + 1]
-                ):
-                    # The continuation line should have more indentation than the first line
-                    first_line_indent = len(output_section_lines[i]) - len(output_section_lines[i].lstrip())
-                    cont_line_indent = len(output_section_lines[i + 1]) - len(output_section_lines[i + 1].lstrip())
-                    assert cont_line_indent > first_line_indent
-                break
+        # Verify the text sits in the Output section and its continuation lines hang further in
+        lines = rp.lines
+        output_idx = rp.index_of_prefix("1. Output")
+        text_idx = rp.index_containing("This is a multiline text")
+        assert output_idx is not None, "Output section not found"
+        assert text_idx is not None and text_idx > output_idx, "Multiline text not found in output"
 
-        assert multiline_found, "Multiline text not found in output"
+        first_line, cont_line = lines[text_idx], lines[text_idx + 1]
+        assert "that should be rendered with proper" in cont_line
+        assert len(cont_line) - len(cont_line.lstrip()) > len(first_line) - len(first_line.lstrip())
 
-    def test_empty_prompt_rendering(self):
+    def test_empty_prompt_rendering(self, prompt):
         """Test that an empty prompt renders correctly."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         rendered = prompt.render_prompt()
 
         # Should render just the prologue (if any) and no sections
@@ -438,10 +483,8 @@ hanging indentation for continuation lines."""
         # Should render just the prologue
         assert rendered.strip() == "Test Prologue"
 
-    def test_set_role_function(self):
+    def test_set_role_function(self, prompt):
         """Test that set_role sets the role field and renders it as **Role**."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Set the role using set_role function
         prompt.set_role("You are a helpful assistant")
 
@@ -494,10 +537,8 @@ hanging indentation for continuation lines."""
         assert "This is critical" in rendered
         assert "1." not in rendered  # No sections
 
-    def test_complex_nested_structure(self):
+    def test_complex_nested_structure(self, prompt):
         """Test a complex nested structure to ensure proper rendering."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.Output] = [
             PromptSection(
                 "Complex Template",
@@ -525,33 +566,23 @@ hanging indentation for continuation lines."""
         assert "Plain text item" in rendered
         assert "Another main item" in rendered
 
-    def test_deep_stage_assignment_without_parent(self):
+    def test_deep_stage_assignment_without_parent(self, prompt):
         """Test that assigning a deep stage without explicit parent assignment auto-creates entire hierarchy."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Assign to deep stage without ever assigning to parent Stages.Output
         prompt[Stages.Output.OutputTemplateRules] = ["New Rule"]
 
-        rendered = prompt.render_prompt()
+        rp = RenderedPrompt(prompt)
 
         # Verify the entire hierarchy is created and shown
-        assert "1. Output" in rendered
-        assert "Output Template Rules" in rendered
-        assert "New Rule" in rendered
+        assert "1. Output" in rp.text
+        assert "Output Template Rules" in rp.text
+        assert "New Rule" in rp.text
 
         # Verify the structure is properly nested
-        lines = rendered.split("\n")
-        output_line_idx = None
-        template_rules_line_idx = None
-        new_rule_line_idx = None
-
-        for i, line in enumerate(lines):
-            if line.strip().startswith("1. Output"):
-                output_line_idx = i
-            elif "Output Template Rules" in line:
-                template_rules_line_idx = i
-            elif "New Rule" in line:
-                new_rule_line_idx = i
+        lines = rp.lines
+        output_line_idx = rp.index_of_prefix("1. Output")
+        template_rules_line_idx = rp.index_containing("Output Template Rules")
+        new_rule_line_idx = rp.index_containing("New Rule")
 
         # Verify all components are found
         assert output_line_idx is not None, "Output section not found"
@@ -573,10 +604,8 @@ hanging indentation for continuation lines."""
         assert new_rule_line.startswith("    "), f"Expected indented New Rule, got: {new_rule_line}"
         assert new_rule_line.strip() == "New Rule", f"Expected just content, got: {new_rule_line}"
 
-    def test_single_item_no_bullets_behavior(self):
+    def test_single_item_no_bullets_behavior(self, prompt):
         """Test that single items don't get bullets but multiple items do."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Test single item case - should not have bullet
         prompt[Stages.Objective] = ["Single item only"]
         rendered_single = prompt.render_prompt()
@@ -627,10 +656,8 @@ hanging indentation for continuation lines."""
         assert "- Initial step" in rendered_after, "First item should have bullet after append"
         assert "- Second step" in rendered_after, "Second item should have bullet after append"
 
-    def test_single_item_with_bullet_style_none_override(self):
+    def test_single_item_with_bullet_style_none_override(self, prompt):
         """Test that bullet_style=None overrides single item behavior (both result in no bullets)."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         # Single item with explicit bullet_style=None
         prompt[Stages.ToolReference] = PromptSection(
             bullet_style=None,
@@ -658,10 +685,8 @@ hanging indentation for continuation lines."""
         assert "- Item 1" not in rendered2, "bullet_style=None should suppress bullets for multiple items"
         assert "- Item 2" not in rendered2, "bullet_style=None should suppress bullets for multiple items"
 
-    def test_nested_single_item_behavior(self):
+    def test_nested_single_item_behavior(self, prompt):
         """Test single item behavior in nested sections."""
-        prompt = StructuredPromptFactory(stage_root=Stages)
-
         prompt[Stages.Planning] = [
             PromptSection("Single Item Section", items=["Only one item"]),
             PromptSection("Multi Item Section", items=["Item A", "Item B"])
@@ -699,6 +724,239 @@ hanging indentation for continuation lines."""
         assert found_multi_content_a, "Multi item A content not found"
         assert found_multi_content_b, "Multi item B content not found"
 
+    def test_render_prompt_reuses_output_until_mutated(self, prompt):
+        """Test that an unchanged prompt returns the cached render and any mutation invalidates it."""
+        prompt[Stages.Objective] = ["Single item only"]
+
+        first = prompt.render_prompt()
+        assert prompt.render_prompt() is first
+
+        # Mutating a nested section directly must still be picked up
+        prompt[Stages.Objective].add_critical_step("VERIFY", "Always verify assumptions")
+        second = prompt.render_prompt()
+        assert second != first
+        assert "!!! MANDATORY STEP [VERIFY] !!!" in second
+
+        prompt[Stages.Objective].items.append(PromptText("Second item"))
+        third = prompt.render_prompt()
+        assert "- Single item only" in third
+        assert "- Second item" in third
+
+        prompt.prefs.spaces_per_level = 4
+        assert "    - Second item" in prompt.render_prompt()
+
+    def test_renumbered_section_keeps_rendered_body(self, prompt):
+        """Test that shifting a section's position re-renders its heading but reuses its body."""
+        prompt[Stages.Planning] = ["Step one", "Step two"]
+        first = RenderedPrompt(prompt)
+        assert first.lines == ["1. Planning", "  - Step one", "  - Step two"]
+
+        prompt[Stages.Objective] = ["Complete the task"]
+        rendered = RenderedPrompt(prompt)
+        planning = rendered.index_of_prefix("2. Planning")
+        assert rendered.lines[planning : planning + 3] == ["2. Planning", "  - Step one", "  - Step two"]
+
+    def test_plain_strings_share_prompt_text_items(self, prompt):
+        """Test that identical plain strings are coerced to one shared PromptText."""
+        prompt[Stages.Objective] = ["Shared line", "Other line"]
+        prompt[Stages.Planning] = ["Shared line"]
+
+        shared = prompt[Stages.Objective].items[0]
+        assert prompt[Stages.Planning].items[0] is shared
+        assert PromptText.of("Shared line") is shared
+
+    def test_editing_prompt_text_in_place_updates_render(self, prompt):
+        """Test that assigning to an item's text shows up in the next render."""
+        item = TaggedText("Tagged line", tag="policy")
+        prompt[Stages.Output] = [item, "Plain line"]
+        assert "- Tagged line" in prompt.render_prompt()
+
+        item.text = "Edited line"
+        assert "- Edited line" in prompt.render_prompt()
+
+        plain = prompt[Stages.Output].items[1]
+        plain.text = "Edited plain line"
+        rendered = prompt.render_prompt()
+        assert "- Edited plain line" in rendered and "- Plain line" not in rendered
+        assert PromptText.of("Plain line").text == "Plain line"
+
+    def test_copying_prompt_text_subclass_keeps_fields(self):
+        """Test that deep copies and pickles of PromptText subclasses keep their extra fields."""
+        section = PromptSection("Rules", items=[TaggedText("Cite sources", tag="important"), "Plain"])
+        for clone in (copy.deepcopy(section), pickle.loads(pickle.dumps(section))):
+            assert clone.items[0] == TaggedText("Cite sources", tag="important")
+            assert clone.items[1] is PromptText.of("Plain")
+
+    def test_copying_prompt_text_subclass_with_own_init(self):
+        """Test that PromptText subclasses with their own __init__ can be copied, pickled and weakly referenced."""
+        item = StyledText("Cite sources", "bold")
+        for clone in (copy.copy(item), copy.deepcopy(item), pickle.loads(pickle.dumps(item))):
+            assert type(clone) is StyledText
+            assert (clone.text, clone.style) == ("Cite sources", "bold")
+        assert weakref.ref(item)() is item
+        assert weakref.ref(PromptText.of("Plain"))() is PromptText.of("Plain")
+
+    def test_overridden_render_is_not_served_from_cache(self, prompt):
+        """Test that items and sections overriding render() show their current state."""
+
+        @dataclasses.dataclass
+        class LabelledText(PromptText):
+            tag: str = "none"
+
+            def render(self, *, idx, level, prefs, prev_style, ignore_bullets):
+                return f"[{self.tag}] {self.text}"
+
+        class LabelledSection(PromptSection):
+            label = "draft"
+
+            def render(self, *, idx, level, prefs, prev_style, ignore_bullets):
+                return f"<{self.label}>"
+
+        prompt[Stages.Objective] = [LabelledText("x", tag="a")]
+        assert "[a] x" in prompt.render_prompt()
+        prompt[Stages.Objective].items[0] = LabelledText("x", tag="b")
+        assert "[b] x" in prompt.render_prompt()
+
+        section = LabelledSection("Notes", items=["One"])
+        prompt[Stages.Output] = [section]
+        assert "<draft>" in prompt.render_prompt()
+        section.label = "final"
+        assert "<final>" in prompt.render_prompt()
+
+    def test_importing_shim_defers_builder_import(self):
+        """Test that importing the package or its compatibility shim loads the builder only on first use."""
+        code = (
+            "import sys, structured_prompt.dynamic_prompt_builder as shim\n"
+            "assert 'structured_prompt.builder' not in sys.modules\n"
+            "assert 'structured_prompt.generator' not in sys.modules\n"
+            "from structured_prompt.builder import PromptText\n"
+            "assert shim.PromptText is PromptText\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_render_to_matches_render_prompt(self):
+        """Test that render_to writes exactly what render_prompt returns."""
+        prompt = StructuredPromptFactory(prologue="Test Prologue", stage_root=Stages)
+        prompt.add_critical_step("VERIFY", "Always verify assumptions")
+        prompt[Stages.Objective] = ["Complete the task"]
+        prompt[Stages.Planning] = ["Step one", "Step two"]
+
+        streamed = io.StringIO()
+        prompt.render_to(streamed)
+        assert streamed.getvalue() == prompt.render_prompt()
+
+        # Second write is served from the cached render
+        streamed_again = io.StringIO()
+        prompt.render_to(streamed_again)
+        assert streamed_again.getvalue() == streamed.getvalue()
+
+    def test_section_render_reused_for_unchanged_subtree(self):
+        """Test that a section re-renders only when its own subtree changes."""
+        prefs = IndentationPreferences()
+        inner = PromptSection("Inner", items=["Item A", "Item B"])
+        outer = PromptSection("Outer", items=[inner, "Plain"])
+
+        first = outer.render(idx=1, level=0, prefs=prefs, prev_style=None, ignore_bullets=False)
+        assert outer.render(idx=1, level=0, prefs=prefs, prev_style=None, ignore_bullets=False) == first
+
+        prompt = StructuredPromptFactory(prefs=prefs)
+        prompt["outer"] = outer
+        rendered = prompt.render_prompt()
+        assert prompt.render_prompt() is rendered
+
+        inner.items.append(PromptText("Item C"))
+        second = outer.render(idx=1, level=0, prefs=prefs, prev_style=None, ignore_bullets=False)
+        assert second == first.replace("* Item B", "* Item B\n    * Item C")
+        assert "* Item C" in prompt.render_prompt()
+
+    def test_nested_mutation_marks_ancestors_dirty(self):
+        """Test that changes deep in the tree (or in a shared section) invalidate every containing render."""
+        shared = PromptSection("Shared", items=["Leaf"])
+        left = PromptSection("Left", items=[shared])
+        right = PromptSection("Right", items=[shared])
+        prompt = StructuredPromptFactory()
+        prompt["left"] = left
+        prompt["right"] = right
+
+        first = prompt.render_prompt()
+        assert prompt.render_prompt() is first
+
+        shared.items[0] = PromptText("New leaf")
+        second = prompt.render_prompt()
+        assert second.count("New leaf") == 2 and "- Leaf" not in second
+
+        shared.title = "Renamed"
+        assert prompt.render_prompt().count("Renamed") == 2
+
+        shared.add_critical_step("Check", "Verify output")
+        assert "Verify output" in prompt.render_prompt()
+        assert first != prompt.render_prompt()
+
+    def test_item_list_outlives_its_section(self):
+        """Test that an item list kept after its section is gone still behaves like a list."""
+        items = PromptSection("A", ["a"]).items
+        items.append(PromptText("b"))
+        items.append(PromptSection("C"))
+        items.insert(0, PromptText("z"))
+        assert [getattr(item, "text", None) for item in items[:3]] == ["z", "a", "b"]
+
+    def test_text_only_section_switches_to_mixed_items(self):
+        """Test that a section of plain strings renders correctly as it gains and loses subsections."""
+        kwargs = {"idx": 1, "level": 0, "prefs": IndentationPreferences(), "prev_style": None, "ignore_bullets": False}
+        section = PromptSection("List", items=["First", "Second"])
+        assert section.render(**kwargs) == "1. List\n  - First\n  - Second"
+
+        section.items.insert(1, PromptSection("Nested", items=["Inner"]))
+        assert section.render(**kwargs) == "1. List\n  - First\n  - Nested\n    Inner\n  - Second"
+
+        del section.items[1]
+        section.items[1] = PromptText("Replaced")
+        assert section.render(**kwargs) == "1. List\n  - First\n  - Replaced"
+
+    def test_child_layout_follows_in_place_item_edits(self):
+        """Test that the single, unbulleted and bulleted child layouts follow in-place item edits."""
+        kwargs = {"idx": 1, "level": 0, "prefs": IndentationPreferences(), "prev_style": None, "ignore_bullets": False}
+        section = PromptSection("Rules", items=["Only rule"])
+        assert section.render(**kwargs) == "1. Rules\n  Only rule"
+
+        section.items.append(PromptText("Second rule"))
+        assert section.render(**kwargs) == "1. Rules\n  - Only rule\n  - Second rule"
+
+        section.bullet_style = None
+        assert section.render(**kwargs) == "1. Rules\n  Only rule\n  Second rule"
+
+    def test_shared_section_reused_across_many_prompts(self):
+        """Test that a section reused by many short-lived prompts stays cheap and renders its changes."""
+        shared = PromptSection("Boilerplate", items=["Rule A", "Rule B"])
+        first_prompt = None
+        for turn in range(2000):
+            prompt = StructuredPromptFactory(stage_root=Stages)
+            prompt["boilerplate"] = shared
+            prompt[Stages.Objective] = f"Turn {turn}"
+            rendered = prompt.render_prompt()
+            if first_prompt is None:
+                first_prompt = weakref.ref(prompt)
+
+        assert "- Rule B" in rendered and "Turn 1999" in rendered
+        # The shared section must not keep earlier prompts alive
+        assert first_prompt() is None
+
+        shared.items.append(PromptText("Rule C"))
+        assert "- Rule C" in prompt.render_prompt()
+
+    def test_copied_section_tracks_its_own_changes(self):
+        """Test that deep copies and pickles keep change tracking independent of the original."""
+        inner = PromptSection("Inner", items=["One"])
+        outer = PromptSection("Outer", items=[inner])
+        kwargs = {"idx": 1, "level": 0, "prefs": IndentationPreferences(), "prev_style": None, "ignore_bullets": False}
+        original = outer.render(**kwargs)
+
+        for clone in (copy.deepcopy(outer), pickle.loads(pickle.dumps(outer))):
+            assert clone.render(**kwargs) == original
+            clone.items[0].items.append(PromptText("Two"))
+            assert "Two" in clone.render(**kwargs)
+            assert outer.render(**kwargs) == original
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -8,6 +8,8 @@ import pytest
 from structured_prompt import IndentationPreferences, PromptSection, PromptText, StructuredPromptFactory
 from structured_prompt.generator.prompt_structure_generator import generate_stages_module
 
+from ._render_helpers import RenderedPrompt
+
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
@@ -404,24 +406,15 @@ class TestGeneratedStagesIntegration:
         prompt[self.Stages.ToolReference] = ["[tracing|...]", "[metrics|...]", "[infra|...]"]
         prompt[self.Stages.Scoping] = ["Define scope"]
 
-        rendered = prompt.render_prompt()
+        rp = RenderedPrompt(prompt)
+        rendered = rp.text
 
         # Find the positions of each section
-        lines = rendered.split("\n")
-        planning_idx = None
-        quality_gates_idx = None
-        tool_reference_idx = None
-        scoping_idx = None
-
-        for i, line in enumerate(lines):
-            if line.strip().startswith("1. Tool Reference"):
-                tool_reference_idx = i
-            elif line.strip().startswith("2. Scoping"):
-                scoping_idx = i
-            elif line.strip().startswith("3. Planning"):
-                planning_idx = i
-            elif line.strip().startswith("4. Quality Gates"):
-                quality_gates_idx = i
+        indices = rp.index_of_prefixes("1. Tool Reference", "2. Scoping", "3. Planning", "4. Quality Gates")
+        tool_reference_idx = indices.get("1. Tool Reference")
+        scoping_idx = indices.get("2. Scoping")
+        planning_idx = indices.get("3. Planning")
+        quality_gates_idx = indices.get("4. Quality Gates")
 
         # Verify all sections are found
         assert planning_idx is not None, f"Planning not found in rendered output: {rendered}"